@@ -4,8 +4,9 @@ import logging
 import os
 import pickle
 import signal
+import threading
 import traceback
-from typing import Any, List
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 
 import keyring
 import yaml
@@ -15,6 +16,12 @@ from keyring.errors import KeyringLocked, PasswordDeleteError
 from llm_studio.app_utils.config import default_cfg
 from llm_studio.app_utils.utils import get_database_dir, get_user_id
 
+try:
+    from yaml import CSafeDumper as SafeDumper
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:  # libyaml is not available
+    from yaml import SafeDumper, SafeLoader  # type: ignore
+
 __all__ = [
     "load_user_settings_and_secrets",
     "load_default_user_settings",
@@ -23,12 +30,18 @@ __all__ = [
 ]
 
 logger = logging.getLogger(__name__)
+PASSWORDS_PHRASES = ("token", "key")
 SECRET_KEYS = [
     key
     for key in default_cfg.user_settings
-    if any(password in key for password in ["token", "key"])
+    if any(password in key for password in PASSWORDS_PHRASES)
+]
+_SECRET_KEYS_SET = frozenset(SECRET_KEYS)
+USER_SETTING_KEYS = [
+    key for key in default_cfg.user_settings if key not in _SECRET_KEYS_SET
 ]
-USER_SETTING_KEYS = [key for key in default_cfg.user_settings if key not in SECRET_KEYS]
+# old settings paths that were already checked for migration in this process
+_MIGRATED: Set[str] = set()
 
 
 async def save_user_settings_and_secrets(q: Q):
@@ -43,10 +56,10 @@ def load_user_settings_and_secrets(q: Q):
 
 
 def load_default_user_settings(q: Q, clear_secrets=True):
-    for key in default_cfg.user_settings:
-        q.client[key] = default_cfg.user_settings[key]
-        if clear_secrets:
-            _clear_secrets(q, key)
+    for key, value in default_cfg.user_settings.items():
+        q.client[key] = value
+    if clear_secrets:
+        _clear_secrets(q, list(default_cfg.user_settings))
 
 
 class NoSaver:
@@ -67,6 +80,12 @@ class NoSaver:
         delete(name: str) -> None:
             Delete the password entry with the given name.
 
+        save_many(passwords: Dict[str, str]) -> None:
+            Save multiple password entries at once.
+
+        delete_many(names: Iterable[str]) -> None:
+            Delete multiple password entries at once.
+
     """
 
     def __init__(self, username: str, root_dir: str):
@@ -82,6 +101,14 @@ class NoSaver:
     def delete(self, name: str):
         pass
 
+    def save_many(self, passwords: Dict[str, str]):
+        for name, password in passwords.items():
+            self.save(name, password)
+
+    def delete_many(self, names: Iterable[str]):
+        for name in names:
+            self.delete(name)
+
 
 class KeyRingSaver(NoSaver):
     """
@@ -89,23 +116,37 @@ class KeyRingSaver(NoSaver):
     Some machines may not have keyring installed, so this class may not be available.
     """
 
+    # Lookups are cached per process, as every keyring access is a round-trip
+    # to the OS credential store. Shared across instances, as a new handler is
+    # created on every request.
+    _cache: Dict[Tuple[str, str], Optional[str]] = {}
+    _lock = threading.Lock()
+
     def __init__(self, username: str, root_dir: str):
         super().__init__(username, root_dir)
         self.namespace = f"{username}_h2o_llmstudio"
 
     def save(self, name: str, password: str):
-        keyring.set_password(self.namespace, name, password)
+        with self._lock:
+            keyring.set_password(self.namespace, name, password)
+            self._cache[(self.namespace, name)] = password
 
     def load(self, name: str):
-        return keyring.get_password(self.namespace, name)
+        with self._lock:
+            key = (self.namespace, name)
+            if key not in self._cache:
+                self._cache[key] = keyring.get_password(self.namespace, name)
+            return self._cache[key]
 
     def delete(self, name: str):
-        try:
-            keyring.delete_password(self.namespace, name)
-        except (KeyringLocked, PasswordDeleteError):
-            pass
-        except Exception as e:
-            logger.warning(f"Error deleting password for keyring: {e}")
+        with self._lock:
+            self._cache.pop((self.namespace, name), None)
+            try:
+                keyring.delete_password(self.namespace, name)
+            except (KeyringLocked, PasswordDeleteError):
+                pass
+            except Exception as e:
+                logger.warning(f"Error deleting password for keyring: {e}")
 
 
 class EnvFileSaver(NoSaver):
@@ -113,37 +154,58 @@ class EnvFileSaver(NoSaver):
     This module provides the EnvFileSaver class, which is used to save, load,
     and delete name-password pairs in an environment file.
     Only use this class if you are sure that the environment file is secure.
+
+    The parsed file is kept on the instance, so that multiple operations
+    only read the file once. Batched updates are written in a single pass.
     """
 
+    def __init__(self, username: str, root_dir: str):
+        super().__init__(username, root_dir)
+        self._data: Optional[Dict[str, str]] = None
+
     @property
     def filename(self):
         return os.path.join(self.root_dir, f"{self.username}.env")
 
     def save(self, name: str, password: str):
-        data = {}
-        if os.path.exists(self.filename):
-            with open(self.filename, "r") as f:
-                data = yaml.safe_load(f)
-        data[name] = password
-        with open(self.filename, "w") as f:
-            yaml.safe_dump(data, f)
+        self.save_many({name: password})
 
     def load(self, name: str):
-        if not os.path.exists(self.filename):
-            return None
-
-        with open(self.filename, "r") as f:
-            data = yaml.safe_load(f)
-            return data.get(name, None)
+        return self._read().get(name, None)
 
     def delete(self, name: str):
-        if os.path.exists(self.filename):
-            with open(self.filename, "r") as f:
-                data = yaml.safe_load(f)
-                if data and name in data:
-                    del data[name]
-            with open(self.filename, "w") as f:
-                yaml.safe_dump(data, f)
+        self.delete_many([name])
+
+    def save_many(self, passwords: Dict[str, str]):
+        if not passwords:
+            return
+        data = dict(self._read())
+        data.update(passwords)
+        self._write(data)
+
+    def delete_many(self, names: Iterable[str]):
+        data = dict(self._read())
+        changed = False
+        for name in names:
+            if name in data:
+                del data[name]
+                changed = True
+        if changed:
+            self._write(data)
+
+    def _read(self) -> Dict[str, str]:
+        if self._data is None:
+            data = None
+            if os.path.exists(self.filename):
+                with open(self.filename, "r") as f:
+                    data = yaml.load(f, Loader=SafeLoader)
+            self._data = data or {}
+        return self._data
+
+    def _write(self, data: Dict[str, str]):
+        with open(self.filename, "w") as f:
+            yaml.dump(data, f, Dumper=SafeDumper)
+        self._data = data
 
 
 # https://stackoverflow.com/questions/2281850/timeout-function-if-it-takes-too-long-to-finish
@@ -206,9 +268,11 @@ class Secrets:
     except Exception as e:
         logger.warning(f"Error loading keyring: {e}. Disabling keyring save option.")
 
+    _names = sorted(_secrets.keys())
+
     @classmethod
     def names(cls) -> List[str]:
-        return sorted(cls._secrets.keys())
+        return list(cls._names)
 
     @classmethod
     def get(cls, name: str) -> Any:
@@ -218,14 +282,15 @@ class Secrets:
 def _save_user_settings(q: Q):
     user_settings = {key: q.client[key] for key in USER_SETTING_KEYS}
     with open(_get_usersettings_path(q), "w") as f:
-        yaml.dump(user_settings, f)
+        yaml.dump(user_settings, f, Dumper=SafeDumper)
 
 
 def _load_user_settings(q: Q):
-    if os.path.isfile(_get_usersettings_path(q)):
+    usersettings_path = _get_usersettings_path(q)
+    if os.path.isfile(usersettings_path):
         logger.info("Reading user settings")
-        with open(_get_usersettings_path(q), "r") as f:
-            user_settings = yaml.load(f, Loader=yaml.FullLoader)
+        with open(usersettings_path, "r") as f:
+            user_settings = yaml.load(f, Loader=SafeLoader)
         for key in USER_SETTING_KEYS:
             q.client[key] = user_settings.get(key, default_cfg.user_settings[key])
     else:
@@ -236,34 +301,35 @@ def _load_user_settings(q: Q):
 
 
 async def _save_secrets(q: Q):
-    secret_name, secrets_handler = _get_secrets_handler(q)
-    for key in SECRET_KEYS:
-        try:
-            _clear_secrets(q, key, excludes=tuple(secret_name))
-            if q.client[key]:
-                secrets_handler.save(key, q.client[key])
-
-        except Exception:
-            exception = str(traceback.format_exc())
-            logger.error(f"Could not save password {key} to {secret_name}")
-            q.page["meta"].dialog = ui.dialog(
-                title="Could not save secrets. "
-                "Please choose another Credential Handler.",
-                name="secrets_error",
-                items=[
-                    ui.text(
-                        f"The following error occurred when"
-                        f" using {secret_name}: {exception}."
-                    ),
-                    ui.button(
-                        name="settings/close_error_dialog", label="Close", primary=True
-                    ),
-                ],
-                closable=True,
-            )
-            q.client["keep_meta"] = True
-            await q.page.save()
-            break
+    secrets_handlers = _get_secrets_handlers(q)
+    secret_name, secrets_handler = _get_secrets_handler(q, secrets_handlers)
+    try:
+        _clear_secrets(
+            q, SECRET_KEYS, excludes=tuple(secret_name), handlers=secrets_handlers
+        )
+        secrets_handler.save_many(
+            {key: q.client[key] for key in SECRET_KEYS if q.client[key]}
+        )
+    except Exception:
+        exception = str(traceback.format_exc())
+        logger.error(f"Could not save passwords to {secret_name}")
+        q.page["meta"].dialog = ui.dialog(
+            title="Could not save secrets. "
+            "Please choose another Credential Handler.",
+            name="secrets_error",
+            items=[
+                ui.text(
+                    f"The following error occurred when"
+                    f" using {secret_name}: {exception}."
+                ),
+                ui.button(
+                    name="settings/close_error_dialog", label="Close", primary=True
+                ),
+            ],
+            closable=True,
+        )
+        q.client["keep_meta"] = True
+        await q.page.save()
     else:  # if no exception
         # force dataset connector updated when the user decides to click on save
         q.client["dataset/import/s3_bucket"] = q.client["default_aws_bucket_name"]
@@ -287,24 +353,42 @@ def _load_secrets(q: Q):
             q.client[key] = ""
 
 
-def _get_secrets_handler(q: Q):
+def _get_secrets_handler(q: Q, handlers: Optional[Dict[str, NoSaver]] = None):
     secret_name = (
         q.client["credential_saver"] or default_cfg.user_settings["credential_saver"]
     )
+    if handlers is not None and secret_name in handlers:
+        return secret_name, handlers[secret_name]
     secrets_handler = Secrets.get(secret_name)(
         username=get_user_id(q), root_dir=get_database_dir(q)
     )
     return secret_name, secrets_handler
 
 
-def _clear_secrets(q: Q, name: str, excludes=tuple()):
-    for secret_name in Secrets.names():
-        if secret_name not in excludes:
-            secrets_handler = Secrets.get(secret_name)(
-                username=get_user_id(q), root_dir=get_database_dir(q)
-            )
+def _get_secrets_handlers(q: Q) -> Dict[str, NoSaver]:
+    """
+    Build one handler per available secret saver, so that callers
+    touching several savers can share the instances.
+    """
+    username, root_dir = get_user_id(q), get_database_dir(q)
+    return {
+        secret_name: Secrets.get(secret_name)(username=username, root_dir=root_dir)
+        for secret_name in Secrets.names()
+    }
 
-            secrets_handler.delete(name)
+
+def _clear_secrets(
+    q: Q,
+    names: Iterable[str],
+    excludes=tuple(),
+    handlers: Optional[Dict[str, NoSaver]] = None,
+):
+    if handlers is None:
+        handlers = _get_secrets_handlers(q)
+    names = list(names)
+    for secret_name, secrets_handler in handlers.items():
+        if secret_name not in excludes:
+            secrets_handler.delete_many(names)
 
 
 def _maybe_migrate_to_yaml(q: Q):
@@ -315,7 +399,10 @@ def _maybe_migrate_to_yaml(q: Q):
     old_usersettings_path = os.path.join(
         get_database_dir(q), f"{get_user_id(q)}.settings"
     )
+    if old_usersettings_path in _MIGRATED:
+        return
     if not os.path.isfile(old_usersettings_path):
+        _MIGRATED.add(old_usersettings_path)
         return
 
     try:
@@ -324,20 +411,22 @@ def _maybe_migrate_to_yaml(q: Q):
 
         secret_name, secrets_handler = _get_secrets_handler(q)
         logger.info(f"Migrating token using {secret_name}")
-        for key in SECRET_KEYS:
-            if key in user_settings:
-                secrets_handler.save(key, user_settings[key])
+        secrets_handler.save_many(
+            {key: user_settings[key] for key in SECRET_KEYS if key in user_settings}
+        )
 
         with open(_get_usersettings_path(q), "w") as f:
             yaml.dump(
                 {
-                    key: value
-                    for key, value in user_settings.items()
-                    if key in USER_SETTING_KEYS
+                    key: user_settings[key]
+                    for key in USER_SETTING_KEYS
+                    if key in user_settings
                 },
                 f,
+                Dumper=SafeDumper,
             )
         os.remove(old_usersettings_path)
+        _MIGRATED.add(old_usersettings_path)
         logger.info(f"Successfully migrated tokens to {secret_name}. Old file deleted.")
     except Exception as e:
         logger.info(
@@ -151,7 +151,7 @@ def ui_table_from_df(
         columns.append(action_column)
 
     rows = []
-    for i, row in df.iterrows():
+    for i, row in zip(df.index, df.values):
         cells = []
 
         for cell in row:
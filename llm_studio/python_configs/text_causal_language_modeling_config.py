@@ -232,6 +232,8 @@ class ConfigNLPCausalLMTokenizer(DefaultConfig):
         self._possible_values["max_length"] = (32, 8192, 32)
         self._possible_values["padding_quantile"] = (0, 1, 0.01)
         self._padding_side = "left"
+        # batches are padded to a multiple of this length, see batch_padding
+        self._pad_to_multiple_of = 8
 
         self._visibility["add_prefix_space"] = -1
 
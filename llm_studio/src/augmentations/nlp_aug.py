@@ -32,7 +32,7 @@ class BaseNLPAug(nn.Module):
         """
 
         if self.cfg.augmentation.token_mask_probability > 0:
-            input_ids = batch["input_ids"].clone()
+            input_ids = batch["input_ids"]
             # special_mask = ~batch["special_tokens_mask"].clone().bool()
             mask = (
                 torch.bernoulli(
@@ -45,8 +45,9 @@ class BaseNLPAug(nn.Module):
                 .bool()
                 # & special_mask
             ).bool()
-            input_ids[mask] = self.cfg._tokenizer_mask_token_id
-            batch["input_ids"] = input_ids.clone()
+            batch["input_ids"] = torch.where(
+                mask, self.cfg._tokenizer_mask_token_id, input_ids
+            )
             batch["attention_mask"][mask] = 0
             if batch["labels"].shape[1] == batch["input_ids"].shape[1]:
                 batch["labels"][mask] = -100
@@ -56,9 +56,9 @@ class ConversationChainHandler:
         self.prompts = get_texts(df, cfg, separator="")
 
         if cfg.dataset.answer_column in df.columns:
-            self.answers = df[cfg.dataset.answer_column].astype(str).tolist()
+            self.answers = df[cfg.dataset.answer_column].astype(str).to_numpy()
         else:
-            self.answers = ["" for _ in range(len(self.prompts))]
+            self.answers = np.full(len(self.prompts), "", dtype=object)
 
         if cfg.dataset.system_column != "None":
             if cfg.dataset.system_column not in df.columns:
@@ -66,11 +66,11 @@ class ConversationChainHandler:
                     f"System column {cfg.dataset.system_column} not found."
                     f"Disabling functionality."
                 )
-                self.systems = ["" for _ in range(len(self.prompts))]
+                self.systems = np.full(len(self.prompts), "", dtype=object)
             else:
-                self.systems = df[cfg.dataset.system_column].astype(str).tolist()
+                self.systems = df[cfg.dataset.system_column].astype(str).to_numpy()
         else:
-            self.systems = ["" for _ in range(len(self.prompts))]
+            self.systems = np.full(len(self.prompts), "", dtype=object)
 
     def get_conversation_chain_ids(self, cfg, df):
         """
@@ -1,11 +1,12 @@
 import codecs
 import collections.abc
 import logging
-from typing import Any, Dict, List, Tuple, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import numpy as np
 import pandas as pd
 import torch
+import torch.nn.functional as F
 from torch.utils.data import Dataset
 
 from llm_studio.src.datasets.conversation_chain_handler import ConversationChainHandler
@@ -29,24 +30,50 @@ class CustomDataset(Dataset):
         self.df = df.copy()
 
         self.tokenizer = get_tokenizer(self.cfg)
+        # avoid repeated attribute lookups on the config and tokenizer per sample
+        self._add_eos = bool(self.cfg.dataset.add_eos_token_to_answer)
+        self._max_length = self.cfg.tokenizer.max_length
+        self._max_length_prompt = self.cfg.tokenizer.max_length_prompt
+        self._max_length_answer = self.cfg.tokenizer.max_length_answer
+        self._mask_prompt_labels = self.cfg.dataset.mask_prompt_labels
+        self._pad_id = self.tokenizer.pad_token_id
+        self._eos_id = self.tokenizer.eos_token_id
         self.conversation_chain_handler = ConversationChainHandler(self.df, cfg)
 
+        # systems, prompts and answers of each sample do not change between
+        # epochs, so they are only parsed, tokenized and truncated once
+        self.system_input_ids = self._encode_texts(
+            [
+                self.parse_system(self.cfg, system)
+                for system in self.conversation_chain_handler.systems
+            ],
+            max_length=self._max_length_prompt,
+            truncation_side="right",
+        )
+        self.prompt_input_ids = self._encode_texts(
+            [
+                self.parse_prompt(self.cfg, prompt)
+                for prompt in self.conversation_chain_handler.prompts
+            ],
+            max_length=self._max_length_prompt,
+            truncation_side="left",
+        )
+        self.answer_input_ids = self._encode_texts(
+            list(self.conversation_chain_handler.answers),
+            max_length=self._max_length_answer - int(self._add_eos),
+            truncation_side="right",
+        )
+
     def __len__(self) -> int:
         return len(self.conversation_chain_handler)
 
     def __getitem__(self, idx: int) -> Dict:
         """Reads a single text observation."""
-        input_text_dict = self.conversation_chain_handler[idx]
-        input_text_dict["systems"] = [
-            self.parse_system(self.cfg, system) for system in input_text_dict["systems"]
-        ]
-        input_text_dict["prompts"] = [
-            self.parse_prompt(self.cfg, prompt) for prompt in input_text_dict["prompts"]
-        ]
+        sample_ids = self.conversation_chain_handler.conversation_chain_ids[idx]
 
         sample = dict()
         system_encoding, prompt_encodings, answer_encodings = self.get_encodings(
-            input_text_dict=input_text_dict
+            sample_ids=sample_ids
         )
 
         input_ids = torch.cat(
@@ -58,54 +85,43 @@ class CustomDataset(Dataset):
             ]
         )
 
-        sample.update(self.get_labels(prompt_encodings, answer_encodings))
         sample.update(
-            self.pad_tokens(
-                input_ids,
-                attention_mask=torch.ones_like(input_ids),
-                max_length=self.cfg.tokenizer.max_length,
-                pad_token_id=self.tokenizer.pad_token_id,
-            )
+            self.get_labels(prompt_encodings, answer_encodings, input_ids=input_ids)
+        )
+        self.pad_tokens(
+            input_ids,
+            max_length=self._max_length,
+            pad_token_id=self._pad_id,
+            sample=sample,
         )
 
         # get answer encodings
-        sample.update(
-            self.pad_tokens(
-                answer_encodings[-1],
-                attention_mask=torch.ones_like(answer_encodings[-1]),
-                max_length=self.cfg.tokenizer.max_length_answer,
-                pad_token_id=self.tokenizer.pad_token_id,
-                direction="right",
-                prefix="answer_",
-            )
+        self.pad_tokens(
+            answer_encodings[-1],
+            max_length=self._max_length_answer,
+            pad_token_id=self._pad_id,
+            direction="right",
+            prefix="answer_",
+            sample=sample,
         )
 
-        # Remove last answer from encoding to create the prompt for inference
-        answer_encodings[-1] = torch.empty(0)
-        prompt_input_ids = torch.cat(
-            [
-                torch.cat([prompt_encoding, answer_encoding])
-                for prompt_encoding, answer_encoding in zip(
-                    prompt_encodings, answer_encodings
-                )
-            ]
-        )
-        sample.update(
-            self.pad_tokens(
-                prompt_input_ids,
-                attention_mask=torch.ones_like(prompt_input_ids),
-                max_length=self.cfg.tokenizer.max_length,
-                pad_token_id=self.tokenizer.pad_token_id,
-                prefix="prompt_",
-            )
+        # Remove last answer from encoding to create the prompt for inference.
+        # The prompt is a prefix of input_ids, so no further concatenation needed.
+        prompt_input_ids = input_ids[: len(input_ids) - len(answer_encodings[-1])]
+        self.pad_tokens(
+            prompt_input_ids,
+            max_length=self._max_length,
+            pad_token_id=self._pad_id,
+            prefix="prompt_",
+            sample=sample,
         )
 
         # make sure system encoding is always prepended if max_length exceeded
-        if sample["input_ids"][0] != self.tokenizer.pad_token_id:
+        if sample["input_ids"][0] != self._pad_id:
             sample["input_ids"][: len(system_encoding)] = system_encoding
-            if self.cfg.dataset.mask_prompt_labels:
+            if self._mask_prompt_labels:
                 sample["labels"][: len(system_encoding)] = -100
-        if sample["prompt_input_ids"][0] != self.tokenizer.pad_token_id:
+        if sample["prompt_input_ids"][0] != self._pad_id:
             sample["prompt_input_ids"][: len(system_encoding)] = system_encoding
         return sample
 
@@ -230,8 +246,10 @@ class CustomDataset(Dataset):
     def postprocess_batch_predictions(self, output: Dict) -> Dict:
         if "predicted_answer_ids" in output.keys():
             predicted_text = [
-                self.tokenizer.decode(ids, skip_special_tokens=True).strip()
-                for ids in output["predicted_answer_ids"]
+                text.strip()
+                for text in self.tokenizer.batch_decode(
+                    output["predicted_answer_ids"], skip_special_tokens=True
+                )
             ]
 
             output["predicted_text"] = np.array(predicted_text)
@@ -336,59 +354,36 @@ class CustomDataset(Dataset):
                 "id" in df.columns
             ), "When using parent column, the dataframe requires an 'id' column. "
 
-    def get_labels(self, prompt_encodings, answer_encodings):
-        labels = torch.cat(
-            [
-                torch.cat([prompt_encoding, answer_encoding])
-                for prompt_encoding, answer_encoding in zip(
-                    prompt_encodings, answer_encodings
-                )
-            ]
-        ).clone()
-
-        if self.cfg.dataset.mask_prompt_labels:
-            prompt_mask = torch.cat(
-                [
-                    torch.cat(
-                        [
-                            torch.ones_like(prompt_encoding),
-                            torch.zeros_like(answer_encoding),
-                        ]
-                    )
-                    for prompt_encoding, answer_encoding in zip(
-                        prompt_encodings, answer_encodings
-                    )
-                ]
-            ).to(torch.bool)
-            labels.masked_fill_(prompt_mask, -100)
-        if self.cfg.dataset.add_eos_token_to_answer:
+    def get_labels(self, prompt_encodings, answer_encodings, input_ids):
+        # labels start from the already concatenated prompt and answer encodings
+        labels = input_ids.clone()
+
+        if self._mask_prompt_labels:
+            # prompt positions follow directly from the encoding lengths
+            start = 0
+            for prompt_encoding, answer_encoding in zip(
+                prompt_encodings, answer_encodings
+            ):
+                labels[start : start + len(prompt_encoding)] = -100
+                start += len(prompt_encoding) + len(answer_encoding)
+        if self._add_eos:
             # eos_token may be equal to pad_token. Add the label back manually.
-            labels[-1] = self.tokenizer.eos_token_id
-        if self.cfg.tokenizer.max_length < len(labels):
-            labels = labels[-self.cfg.tokenizer.max_length :]
+            labels[-1] = self._eos_id
+        labels = labels[-self._max_length :]
 
-        sample = dict(labels=torch.full((self.cfg.tokenizer.max_length,), -100))
-        sample["labels"][-len(labels) :] = labels
+        sample = dict(
+            labels=F.pad(labels.long(), (self._max_length - len(labels), 0), value=-100)
+        )
         return sample
 
-    def get_encodings(self, input_text_dict: Dict[str, List[str]]):
+    def get_encodings(self, sample_ids: List[int]):
         """
         Get encodings for a single conversation history.
         Args:
-            input_text_dict: A dictionary containing the input text for a single sample.
-            Contains the keys "systems", "prompts", "answers".
-            System may be an empty string.
+            sample_ids: The DataFrame indices of the conversation rounds
+            of a single sample, from the first to the last round.
         """
-        encodings = [
-            self._get_sample_encoding(system, prompt, answer)
-            for idx, (system, prompt, answer) in enumerate(
-                zip(
-                    input_text_dict["systems"],
-                    input_text_dict["prompts"],
-                    input_text_dict["answers"],
-                )
-            )
-        ]
+        encodings = [self._get_sample_encoding(sample_idx) for sample_idx in sample_ids]
 
         if self.mode == "train":
             encodings = self.augment_data(encodings)
@@ -415,47 +410,41 @@ class CustomDataset(Dataset):
         # randomly replace parent with another parent
         if np.random.random() < self.cfg.augmentation.random_parent_probability:
             idx = np.random.randint(len(self.conversation_chain_handler.prompts))
-            parent_encodings = [
-                self._get_sample_encoding(
-                    self.parse_system(
-                        self.cfg, self.conversation_chain_handler.systems[idx]
-                    ),
-                    self.parse_prompt(
-                        self.cfg, self.conversation_chain_handler.prompts[idx]
-                    ),
-                    self.conversation_chain_handler.answers[idx],
-                )
-            ] + parent_encodings[1:]
+            parent_encodings = [self._get_sample_encoding(idx)] + parent_encodings[1:]
         encodings = parent_encodings + [encodings[-1]]
         return encodings
 
-    def _get_sample_encoding(self, system: str, prompt: str, answer: str) -> List:
-        if len(system) > 0:
-            system_encoding = self.encode(
-                self.tokenizer, system, self.cfg.tokenizer.max_length_prompt, "right"
-            )["input_ids"]
-        else:
-            system_encoding = torch.empty(0)
-        prompt_encoding = self.encode(
-            self.tokenizer, prompt, self.cfg.tokenizer.max_length_prompt, "left"
-        )["input_ids"]
-        max_length_answer = self.cfg.tokenizer.max_length_answer - int(
-            self.cfg.dataset.add_eos_token_to_answer
-        )
-        answer_encoding = self.encode(
-            self.tokenizer, answer, max_length_answer, "right"
-        )["input_ids"]
-        if self.cfg.dataset.add_eos_token_to_answer:
+    def _get_sample_encoding(self, idx: int) -> List:
+        """Get the system, prompt and answer encodings of the DataFrame row idx."""
+        system_encoding = torch.tensor(self.system_input_ids[idx], dtype=torch.long)
+        prompt_encoding = torch.tensor(self.prompt_input_ids[idx], dtype=torch.long)
+        answer_encoding = torch.tensor(self.answer_input_ids[idx], dtype=torch.long)
+        if self._add_eos:
             answer_encoding = torch.cat(
                 [
                     answer_encoding,
-                    torch.Tensor([self.tokenizer.eos_token_id]),
+                    torch.Tensor([self._eos_id]),
                 ],
                 dim=0,
             )
 
         return [system_encoding, prompt_encoding, answer_encoding]
 
+    def _encode_texts(
+        self, texts: List[str], max_length: int, truncation_side: str
+    ) -> List[np.ndarray]:
+        """Tokenizes all texts with a single tokenizer call and truncates them."""
+        if len(texts) == 0:
+            return []
+        input_ids = self.tokenizer(
+            texts, add_special_tokens=False, return_attention_mask=False
+        )["input_ids"]
+        if truncation_side == "right":
+            input_ids = [ids[:max_length] for ids in input_ids]
+        else:
+            input_ids = [ids[-max_length:] for ids in input_ids]
+        return [np.asarray(ids, dtype=np.int32) for ids in input_ids]
+
     def get_chained_prompt_text_list(self, idx) -> List[str]:
         text_separator = "TEXT_SEPARATOR"
         text_dict = self.conversation_chain_handler[idx]
@@ -473,29 +462,42 @@ class CustomDataset(Dataset):
     @staticmethod
     def pad_tokens(
         input_ids,
-        attention_mask,
         max_length,
         pad_token_id,
+        attention_mask=None,
         direction="left",
         prefix="",
+        sample: Optional[Dict] = None,
     ):
-        sample = {}
+        """
+        Pads input_ids and attention_mask to max_length and stores them
+        as {prefix}input_ids and {prefix}attention_mask in sample,
+        which is created if not given.
+        If attention_mask is None, all input_ids are attended to.
+        """
+        if sample is None:
+            sample = {}
 
         if max_length < len(input_ids):
             input_ids = input_ids[-max_length:]
-            attention_mask = attention_mask[-max_length:]
+            if attention_mask is not None:
+                attention_mask = attention_mask[-max_length:]
 
         if len(input_ids) > 0:
-            if direction == "left":
-                sample[f"{prefix}input_ids"] = torch.full((max_length,), pad_token_id)
-                sample[f"{prefix}input_ids"][-len(input_ids) :] = input_ids
-                sample[f"{prefix}attention_mask"] = torch.zeros(max_length)
-                sample[f"{prefix}attention_mask"][-len(input_ids) :] = attention_mask
+            pad_length = max_length - len(input_ids)
+            padding = (pad_length, 0) if direction == "left" else (0, pad_length)
+            sample[f"{prefix}input_ids"] = F.pad(
+                input_ids.long(), padding, value=pad_token_id
+            )
+            if attention_mask is None:
+                # attend to all positions that hold input ids
+                attention_mask = torch.zeros(max_length)
+                attention_mask[padding[0] : max_length - padding[1]] = 1
+                sample[f"{prefix}attention_mask"] = attention_mask
             else:
-                sample[f"{prefix}input_ids"] = torch.full((max_length,), pad_token_id)
-                sample[f"{prefix}input_ids"][: len(input_ids)] = input_ids
-                sample[f"{prefix}attention_mask"] = torch.zeros(max_length)
-                sample[f"{prefix}attention_mask"][: len(input_ids)] = attention_mask
+                sample[f"{prefix}attention_mask"] = F.pad(
+                    attention_mask.float(), padding, value=0
+                )
         else:
             # Pad everything if empty (continued pretraining)
             sample[f"{prefix}input_ids"] = torch.full((max_length,), pad_token_id)
@@ -27,15 +27,17 @@ class CustomDataset(CausalLMCustomDataset):
         )
         return sample
 
-    def get_labels(self, prompt_encodings, answer_encodings):
+    def get_labels(self, prompt_encodings, answer_encodings, input_ids):
         if self.mode == "train":  # no labels required for RLHF during training
             return dict()
         else:
-            return super().get_labels(prompt_encodings, answer_encodings)
+            return super().get_labels(
+                prompt_encodings, answer_encodings, input_ids=input_ids
+            )
 
-    def get_encodings(self, input_text_dict):
+    def get_encodings(self, sample_ids):
         system_encoding, prompt_encodings, answer_encodings = super().get_encodings(
-            input_text_dict
+            sample_ids
         )
         # remove last ground truth answer,
         # as RLHF will generate the answer from the prompt
@@ -45,8 +47,10 @@ class CustomDataset(CausalLMCustomDataset):
     def postprocess_batch_predictions(self, output: Dict) -> Dict:
         if "predicted_answer_ids" in output.keys():
             predicted_text = [
-                self.tokenizer.decode(ids, skip_special_tokens=True).strip()
-                for ids in output["predicted_answer_ids"]
+                text.strip()
+                for text in self.tokenizer.batch_decode(
+                    output["predicted_answer_ids"], skip_special_tokens=True
+                )
             ]
 
             output["predicted_text"] = np.array(predicted_text)
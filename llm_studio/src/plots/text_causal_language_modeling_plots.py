@@ -2,6 +2,7 @@ import html
 import os
 from typing import Any, Dict
 
+import numpy as np
 import pandas as pd
 
 from llm_studio.src.datasets.text_utils import get_texts, get_tokenizer
@@ -24,65 +25,53 @@ class Plots:
     def plot_batch(cls, batch, cfg) -> PlotData:
         tokenizer = get_tokenizer(cfg)
 
+        # limit to 2000 rows, still renders fast in wave
+        prompt_input_ids = batch["prompt_input_ids"][:2000].detach().cpu().numpy()
+        input_ids = batch["input_ids"][:2000].detach().cpu().numpy()
+        labels = batch.get("labels", batch["input_ids"])[:2000].detach().cpu().numpy()
+
         df = pd.DataFrame(
             {
-                "Prompt Text": [
-                    tokenizer.decode(input_ids, skip_special_tokens=True)
-                    for input_ids in batch["prompt_input_ids"].detach().cpu().numpy()
-                ]
+                "Prompt Text": tokenizer.batch_decode(
+                    prompt_input_ids, skip_special_tokens=True
+                )
             }
         )
         df["Prompt Text"] = df["Prompt Text"].apply(format_for_markdown_visualization)
         if "labels" in batch.keys():
-            df["Answer Text"] = [
-                tokenizer.decode(
-                    [label for label in labels if label != -100],
-                    skip_special_tokens=True,
-                )
-                for labels in batch.get("labels", batch["input_ids"])
-                .detach()
-                .cpu()
-                .numpy()
-            ]
+            # -100 is replaced by the (special) pad token, which is skipped in decoding
+            df["Answer Text"] = tokenizer.batch_decode(
+                np.where(labels == -100, tokenizer.pad_token_id, labels),
+                skip_special_tokens=True,
+            )
+        # convert all rows with a single call and split the tokens afterwards
+        tokens = tokenizer.convert_ids_to_tokens(input_ids.ravel().tolist())
+        seq_len = input_ids.shape[1]
         tokens_list = [
-            tokenizer.convert_ids_to_tokens(input_ids)
-            for input_ids in batch["input_ids"].detach().cpu().numpy()
-        ]
-        masks_list = [
-            [label != -100 for label in labels]
-            for labels in batch.get("labels", batch["input_ids"]).detach().cpu().numpy()
+            tokens[i * seq_len : (i + 1) * seq_len] for i in range(len(input_ids))
         ]
+        masks_list = (labels != -100).tolist()
         df["Tokenized Text"] = [
             list_to_markdown_representation(
                 tokens, masks, pad_token=tokenizer.pad_token, num_chars=100
             )
             for tokens, masks in zip(tokens_list, masks_list)
         ]
-        # limit to 2000 rows, still renders fast in wave
-        df = df.iloc[:2000]
 
         # Convert into a scrollable table by transposing the dataframe
-        df_transposed = pd.DataFrame(columns=["Sample Number", "Field", "Content"])
-        has_answer = "Answer Text" in df.columns
-
-        for i, row in df.iterrows():
-            offset = 2 + int(has_answer)
-            df_transposed.loc[i * offset] = [
-                i,
-                "Prompt Text",
-                row["Prompt Text"],
-            ]
-            if has_answer:
-                df_transposed.loc[i * offset + 1] = [
-                    i,
-                    "Answer Text",
-                    row["Answer Text"],
-                ]
-            df_transposed.loc[i * offset + 1 + int(has_answer)] = [
-                i,
-                "Tokenized Text",
-                row["Tokenized Text"],
-            ]
+        fields = ["Prompt Text", "Answer Text", "Tokenized Text"]
+        fields = [field for field in fields if field in df.columns]
+        offset = len(fields)
+        content = np.empty(len(df) * offset, dtype=object)
+        for j, field in enumerate(fields):
+            content[j::offset] = df[field].values
+        df_transposed = pd.DataFrame(
+            {
+                "Sample Number": np.repeat(np.arange(len(df)), offset),
+                "Field": np.tile(fields, len(df)),
+                "Content": content,
+            }
+        )
 
         path = os.path.join(cfg.output_directory, "batch_viz.parquet")
         df_transposed.to_parquet(path)
@@ -101,15 +90,15 @@ class Plots:
         else:
             target_texts = ""
 
-        markup = ""
-        for input_text, target_text in zip(input_texts, target_texts):
-            markup += f"<p><strong>Input Text: </strong>{html.escape(input_text)}</p>\n"
-            markup += "\n"
-            markup += (
-                f"<p><strong>Target Text: </strong>{html.escape(target_text)}</p>\n"
-            )
-            markup += "\n"
-            markup += get_line_separator_html()
+        line_separator = get_line_separator_html()
+        markup = "".join(
+            f"<p><strong>Input Text: </strong>{html.escape(input_text)}</p>\n"
+            "\n"
+            f"<p><strong>Target Text: </strong>{html.escape(target_text)}</p>\n"
+            "\n"
+            f"{line_separator}"
+            for input_text, target_text in zip(input_texts, target_texts)
+        )
         return PlotData(markup, encoding="html")
 
     @classmethod
@@ -134,11 +123,7 @@ class Plots:
                 "Predicted Text": predicted_text,
             }
         )
-        df["Input Text"] = df["Input Text"].apply(format_for_markdown_visualization)
-        df["Target Text"] = df["Target Text"].apply(format_for_markdown_visualization)
-        df["Predicted Text"] = df["Predicted Text"].apply(
-            format_for_markdown_visualization
-        )
+        df = df.applymap(format_for_markdown_visualization)
 
         if val_outputs.get("metrics") is not None:
             df[f"Metric ({cfg.prediction.metric})"] = val_outputs["metrics"]
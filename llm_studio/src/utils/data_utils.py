@@ -556,46 +556,47 @@ def batch_padding(
     elif cfg.tokenizer.padding_quantile == 0:
         return batch
     elif training and cfg.tokenizer.padding_quantile < 1.0:
+        # first (left padding) or last (right padding) non-padded position per row
+        is_token = (batch[mask_key] == 1).int()
         if padding_side == "left":
             idx = int(
                 torch.floor(
                     torch.quantile(
-                        torch.stack(
-                            [
-                                torch.where(batch[mask_key][i] == 1)[0].min()
-                                for i in range(batch[mask_key].size(0))
-                            ]
-                        ).float(),
+                        is_token.argmax(dim=1).float(),
                         1 - cfg.tokenizer.padding_quantile,
                     )
                 )
             )
         else:
+            last_token_idx = is_token.size(1) - 1 - is_token.flip(1).argmax(dim=1)
             idx = int(
                 torch.ceil(
                     torch.quantile(
-                        torch.stack(
-                            [
-                                torch.where(batch[mask_key][i] == 1)[0].max()
-                                for i in range(batch[mask_key].size(0))
-                            ]
-                        ).float(),
+                        last_token_idx.float(),
                         cfg.tokenizer.padding_quantile,
                     )
                 )
             )
     else:
+        # positions that hold a non-padded token in any row of the batch
+        has_token = (batch[mask_key] == 1).any(dim=0).int()
         if padding_side == "left":
-            idx = int(torch.where(batch[mask_key] == 1)[1].min())
+            idx = int(has_token.argmax())
         else:
-            idx = int(torch.where(batch[mask_key] == 1)[1].max())
+            idx = int(has_token.size(0) - 1 - has_token.flip(0).argmax())
 
+    # round the padded length up to a multiple that suits tensor core kernels
+    pad_to_multiple_of = getattr(cfg.tokenizer, "_pad_to_multiple_of", 1)
+    max_length = batch[mask_key].size(1)
     if padding_side == "left":
+        length = math.ceil((max_length - idx) / pad_to_multiple_of) * pad_to_multiple_of
+        idx = max(max_length - length, 0)
         for key in pad_keys:
             if key in batch:
                 batch[key] = batch[key][:, idx:].contiguous()
     else:
         idx += 1
+        idx = min(math.ceil(idx / pad_to_multiple_of) * pad_to_multiple_of, max_length)
         for key in pad_keys:
             if key in batch:
                 batch[key] = batch[key][:, :idx].contiguous()
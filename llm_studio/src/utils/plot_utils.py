@@ -5,6 +5,8 @@ from typing import List
 
 PLOT_ENCODINGS = ["image", "html", "df"]
 
+CODE_BLOCK_REGEX = re.compile(r"(```.*?```|``.*?``)", flags=re.DOTALL)
+
 
 @dataclass
 class PlotData:
@@ -76,8 +78,7 @@ def format_for_markdown_visualization(text: str) -> str:
     in some other context than marking code cells or uses ` within
     the code itself (as this function).
     """
-    code_block_regex = r"(```.*?```|``.*?``)"
-    parts = re.split(code_block_regex, text, flags=re.DOTALL)
+    parts = CODE_BLOCK_REGEX.split(text)
     for i in range(len(parts)):
         # Only substitute for text outside matched code blocks
         if "`" not in parts[i]:
@@ -102,14 +103,15 @@ def list_to_markdown_representation(
     """
     x = []
     sublist: List[str] = []
-    raw_sublist: List[str] = []
+    # length of the raw tokens of the current line joined by ", "
+    raw_length = 0
     for token, mask in zip(tokens, masks):
-        if len(token) + len(", ".join(raw_sublist)) > num_chars:
+        if len(token) + raw_length > num_chars:
             x.append(", ".join(sublist))
             sublist = []
-            raw_sublist = []
+            raw_length = 0
 
-        raw_sublist.append(token)
+        raw_length += len(token) + (2 if sublist else 0)
         token_formatted = html.escape(token)
         if mask:
             token_formatted = f"""***{token_formatted}***"""
@@ -0,0 +1,287 @@
+import os
+import pickle
+from unittest import mock
+
+import pytest
+import yaml
+
+from llm_studio.app_utils.setting_utils import (
+    SECRET_KEYS,
+    USER_SETTING_KEYS,
+    EnvFileSaver,
+    KeyRingSaver,
+    NoSaver,
+    _clear_secrets,
+    _maybe_migrate_to_yaml,
+)
+
+
+def test_no_saver_batched_operations_call_single_operations():
+    saver = NoSaver("test_user", "/")
+    with mock.patch.object(saver, "save") as save, mock.patch.object(
+        saver, "delete"
+    ) as delete:
+        saver.save_many({"name": "password", "name2": "password2"})
+        saver.delete_many(["name", "name2"])
+
+    assert save.call_args_list == [
+        mock.call("name", "password"),
+        mock.call("name2", "password2"),
+    ]
+    assert delete.call_args_list == [mock.call("name"), mock.call("name2")]
+
+
+@pytest.fixture
+def keyring_mock():
+    KeyRingSaver._cache.clear()
+    with mock.patch("keyring.set_password") as set_password, mock.patch(
+        "keyring.get_password", return_value="password"
+    ) as get_password, mock.patch("keyring.delete_password") as delete_password:
+        yield mock.Mock(
+            set_password=set_password,
+            get_password=get_password,
+            delete_password=delete_password,
+        )
+    KeyRingSaver._cache.clear()
+
+
+def test_keyring_saver_caches_loads(keyring_mock):
+    saver = KeyRingSaver("test_user", "/")
+    assert saver.load("name") == "password"
+    assert saver.load("name") == "password"
+    # the cache is shared across instances, as a new one is created per request
+    assert KeyRingSaver("test_user", "/").load("name") == "password"
+
+    keyring_mock.get_password.assert_called_once_with("test_user_h2o_llmstudio", "name")
+
+
+def test_keyring_saver_caches_missing_entries(keyring_mock):
+    keyring_mock.get_password.return_value = None
+    saver = KeyRingSaver("test_user", "/")
+    assert saver.load("name") is None
+    assert saver.load("name") is None
+
+    keyring_mock.get_password.assert_called_once()
+
+
+def test_keyring_saver_cache_is_per_user(keyring_mock):
+    keyring_mock.get_password.side_effect = lambda namespace, name: namespace
+    assert KeyRingSaver("user1", "/").load("name") == "user1_h2o_llmstudio"
+    assert KeyRingSaver("user2", "/").load("name") == "user2_h2o_llmstudio"
+
+
+def test_keyring_saver_save_updates_cache(keyring_mock):
+    saver = KeyRingSaver("test_user", "/")
+    assert saver.load("name") == "password"
+    saver.save("name", "new_password")
+
+    assert saver.load("name") == "new_password"
+    keyring_mock.set_password.assert_called_once_with(
+        "test_user_h2o_llmstudio", "name", "new_password"
+    )
+    keyring_mock.get_password.assert_called_once()
+
+
+def test_keyring_saver_delete_invalidates_cache(keyring_mock):
+    saver = KeyRingSaver("test_user", "/")
+    assert saver.load("name") == "password"
+    saver.delete("name")
+    keyring_mock.get_password.return_value = None
+
+    assert saver.load("name") is None
+    keyring_mock.delete_password.assert_called_once_with(
+        "test_user_h2o_llmstudio", "name"
+    )
+    assert keyring_mock.get_password.call_count == 2
+
+
+def test_keyring_saver_failed_load_is_not_cached(keyring_mock):
+    keyring_mock.get_password.side_effect = [RuntimeError("locked"), "password"]
+    saver = KeyRingSaver("test_user", "/")
+    with pytest.raises(RuntimeError):
+        saver.load("name")
+
+    assert saver.load("name") == "password"
+    assert keyring_mock.get_password.call_count == 2
+
+
+def test_keyring_saver_failed_save_is_not_cached(keyring_mock):
+    saver = KeyRingSaver("test_user", "/")
+    assert saver.load("name") == "password"
+    keyring_mock.set_password.side_effect = RuntimeError("locked")
+    with pytest.raises(RuntimeError):
+        saver.save("name", "new_password")
+
+    assert saver.load("name") == "password"
+
+
+def test_env_file_saver_save_many(tmpdir):
+    saver = EnvFileSaver("test_user", str(tmpdir))
+    saver.save("name", "password")
+    saver.save_many({"name2": "password2", "name3": "password3"})
+
+    assert saver.load("name") == "password"
+    assert saver.load("name2") == "password2"
+    assert saver.load("name3") == "password3"
+
+    # a new saver reads the same entries from the file
+    saver = EnvFileSaver("test_user", str(tmpdir))
+    assert saver.load("name") == "password"
+    assert saver.load("name2") == "password2"
+    assert saver.load("name3") == "password3"
+
+
+def test_env_file_saver_save_many_empty(tmpdir):
+    saver = EnvFileSaver("test_user", str(tmpdir))
+    saver.save_many({})
+    assert not os.path.exists(saver.filename)
+
+
+def test_env_file_saver_delete_many(tmpdir):
+    saver = EnvFileSaver("test_user", str(tmpdir))
+    saver.save_many({"name": "password", "name2": "password2", "name3": "password3"})
+    saver.delete_many(["name", "name3"])
+
+    saver = EnvFileSaver("test_user", str(tmpdir))
+    assert saver.load("name") is None
+    assert saver.load("name2") == "password2"
+    assert saver.load("name3") is None
+
+
+def test_env_file_saver_delete_many_missing_file(tmpdir):
+    saver = EnvFileSaver("test_user", str(tmpdir))
+    with mock.patch.object(saver, "_write") as write:
+        saver.delete_many(["name", "name2"])
+
+    write.assert_not_called()
+    assert not os.path.exists(saver.filename)
+    assert saver.load("name") is None
+
+
+def test_env_file_saver_delete_many_missing_names(tmpdir):
+    saver = EnvFileSaver("test_user", str(tmpdir))
+    saver.save("name", "password")
+
+    saver = EnvFileSaver("test_user", str(tmpdir))
+    with mock.patch.object(saver, "_write") as write:
+        saver.delete_many(["name2", "name3"])
+
+    write.assert_not_called()
+    assert saver.load("name") == "password"
+
+
+def test_env_file_saver_reads_file_once(tmpdir):
+    EnvFileSaver("test_user", str(tmpdir)).save_many(
+        {"name": "password", "name2": "password2"}
+    )
+
+    saver = EnvFileSaver("test_user", str(tmpdir))
+    with mock.patch("yaml.load", wraps=yaml.load) as load:
+        assert saver.load("name") == "password"
+        assert saver.load("name2") == "password2"
+        assert saver.load("name3") is None
+
+    assert load.call_count == 1
+
+
+def test_env_file_saver_memoized_read_after_write(tmpdir):
+    saver = EnvFileSaver("test_user", str(tmpdir))
+    saver.save("name", "password")
+    saver.save("name2", "password2")
+    saver.delete("name")
+
+    # entries are served from the data kept on write, without reading the file
+    with mock.patch("builtins.open") as open_:
+        assert saver.load("name") is None
+        assert saver.load("name2") == "password2"
+    open_.assert_not_called()
+
+    # and match what was written to the file
+    with open(saver.filename, "r") as f:
+        assert yaml.safe_load(f) == {"name2": "password2"}
+
+
+def test_clear_secrets_skips_excluded_handlers():
+    handlers = {"Keep": mock.MagicMock(), "Clear": mock.MagicMock()}
+
+    _clear_secrets(
+        mock.MagicMock(),
+        (name for name in ["name", "name2"]),
+        excludes=("Keep",),
+        handlers=handlers,
+    )
+
+    handlers["Keep"].delete_many.assert_not_called()
+    handlers["Clear"].delete_many.assert_called_once_with(["name", "name2"])
+
+
+@pytest.fixture
+def migration_dir(tmpdir):
+    with mock.patch(
+        "llm_studio.app_utils.setting_utils.get_database_dir",
+        return_value=str(tmpdir),
+    ), mock.patch("llm_studio.app_utils.setting_utils._MIGRATED", set()):
+        yield str(tmpdir)
+
+
+def get_q(user_id="test_user"):
+    q = mock.MagicMock()
+    q.auth.subject = user_id
+    q.client = {"credential_saver": ".env File"}
+    return q
+
+
+def write_old_settings(root_dir, user_id="test_user", content=None):
+    path = os.path.join(root_dir, f"{user_id}.settings")
+    if content is None:
+        content = pickle.dumps(
+            {SECRET_KEYS[0]: "secret", USER_SETTING_KEYS[0]: "setting"}
+        )
+    with open(path, "wb") as f:
+        f.write(content)
+    return path
+
+
+def test_migrate_to_yaml(migration_dir):
+    old_path = write_old_settings(migration_dir)
+
+    _maybe_migrate_to_yaml(get_q())
+
+    assert not os.path.exists(old_path)
+    with open(os.path.join(migration_dir, "test_user.yaml"), "r") as f:
+        assert yaml.safe_load(f) == {USER_SETTING_KEYS[0]: "setting"}
+    assert EnvFileSaver("test_user", migration_dir).load(SECRET_KEYS[0]) == "secret"
+
+
+def test_migrate_to_yaml_runs_once_per_settings_file(migration_dir):
+    _maybe_migrate_to_yaml(get_q())
+    old_path = write_old_settings(migration_dir)
+    other_path = write_old_settings(migration_dir, user_id="other_user")
+
+    # the settings file was already checked for this user
+    _maybe_migrate_to_yaml(get_q())
+    assert os.path.exists(old_path)
+
+    # but not for other users
+    _maybe_migrate_to_yaml(get_q("other_user"))
+    assert not os.path.exists(other_path)
+
+    with mock.patch("os.path.isfile") as isfile:
+        _maybe_migrate_to_yaml(get_q())
+        _maybe_migrate_to_yaml(get_q("other_user"))
+    isfile.assert_not_called()
+
+
+def test_failed_migration_is_retried(migration_dir):
+    old_path = write_old_settings(migration_dir, content=b"not a pickle")
+
+    _maybe_migrate_to_yaml(get_q())
+
+    assert os.path.exists(old_path)
+    assert not os.path.exists(os.path.join(migration_dir, "test_user.yaml"))
+
+    write_old_settings(migration_dir)
+    _maybe_migrate_to_yaml(get_q())
+
+    assert not os.path.exists(old_path)
+    assert os.path.exists(os.path.join(migration_dir, "test_user.yaml"))
@@ -0,0 +1,154 @@
+from unittest import mock
+
+import pytest
+import torch
+
+from llm_studio.src.utils.data_utils import batch_padding
+
+
+def get_cfg(padding_quantile=1.0, pad_to_multiple_of=1):
+    cfg = mock.MagicMock()
+    cfg.environment.compile_model = False
+    cfg.tokenizer.padding_quantile = padding_quantile
+    cfg.tokenizer._pad_to_multiple_of = pad_to_multiple_of
+    return cfg
+
+
+def get_batch(token_lengths, max_length, padding_side):
+    attention_mask = torch.zeros(len(token_lengths), max_length, dtype=torch.long)
+    for i, length in enumerate(token_lengths):
+        if padding_side == "left":
+            attention_mask[i, max_length - length :] = 1
+        else:
+            attention_mask[i, :length] = 1
+    input_ids = torch.arange(len(token_lengths) * max_length).view(
+        len(token_lengths), max_length
+    )
+    return {"input_ids": input_ids, "attention_mask": attention_mask}
+
+
+def reference_cut(batch, padding_quantile, training, padding_side):
+    """Position at which batch_padding cut batches before rounding was added."""
+    mask = batch["attention_mask"]
+    if training and padding_quantile < 1.0:
+        if padding_side == "left":
+            first_token_idx = torch.stack(
+                [torch.where(row == 1)[0].min() for row in mask]
+            ).float()
+            return int(
+                torch.floor(torch.quantile(first_token_idx, 1 - padding_quantile))
+            )
+        last_token_idx = torch.stack(
+            [torch.where(row == 1)[0].max() for row in mask]
+        ).float()
+        return int(torch.ceil(torch.quantile(last_token_idx, padding_quantile))) + 1
+    if padding_side == "left":
+        return int(torch.where(mask == 1)[1].min())
+    return int(torch.where(mask == 1)[1].max()) + 1
+
+
+@pytest.mark.parametrize(
+    "padding_side, padding_quantile, training, expected_length",
+    [
+        # longest sample has 17 tokens
+        ("left", 1.0, True, 17),
+        ("right", 1.0, True, 17),
+        ("left", 1.0, False, 17),
+        ("right", 1.0, False, 17),
+        # median sample has 10 tokens
+        ("left", 0.5, True, 10),
+        ("right", 0.5, True, 10),
+        # quantile is ignored outside of training
+        ("left", 0.5, False, 17),
+        ("right", 0.5, False, 17),
+    ],
+)
+def test_batch_padding_cuts_at_longest_or_quantile(
+    padding_side, padding_quantile, training, expected_length
+):
+    cfg = get_cfg(padding_quantile=padding_quantile)
+    batch = get_batch([5, 10, 17], max_length=20, padding_side=padding_side)
+    input_ids = batch["input_ids"].clone()
+
+    batch = batch_padding(cfg, batch, training=training, padding_side=padding_side)
+
+    assert batch["input_ids"].shape == (3, expected_length)
+    assert batch["attention_mask"].shape == (3, expected_length)
+    if padding_side == "left":
+        assert torch.equal(batch["input_ids"], input_ids[:, -expected_length:])
+    else:
+        assert torch.equal(batch["input_ids"], input_ids[:, :expected_length])
+
+
+@pytest.mark.parametrize("padding_side", ["left", "right"])
+@pytest.mark.parametrize(
+    "padding_quantile, training", [(1.0, True), (1.0, False), (0.5, True)]
+)
+def test_batch_padding_rounds_up_to_multiple(padding_side, padding_quantile, training):
+    cfg = get_cfg(padding_quantile=padding_quantile, pad_to_multiple_of=8)
+    batch = get_batch([5, 10, 12], max_length=32, padding_side=padding_side)
+    input_ids = batch["input_ids"].clone()
+
+    batch = batch_padding(cfg, batch, training=training, padding_side=padding_side)
+
+    # 12 (longest) and 10 (median) tokens are both rounded up to 16
+    assert batch["input_ids"].shape == (3, 16)
+    assert batch["attention_mask"].shape == (3, 16)
+    if padding_side == "left":
+        assert torch.equal(batch["input_ids"], input_ids[:, -16:])
+    else:
+        assert torch.equal(batch["input_ids"], input_ids[:, :16])
+    # no tokens are cut away
+    assert batch["attention_mask"].sum(dim=1).tolist() == [5, 10, 12]
+
+
+@pytest.mark.parametrize("padding_side", ["left", "right"])
+def test_batch_padding_rounding_is_capped_at_padded_length(padding_side):
+    cfg = get_cfg(pad_to_multiple_of=8)
+    batch = get_batch([5, 10, 17], max_length=20, padding_side=padding_side)
+    input_ids = batch["input_ids"].clone()
+
+    batch = batch_padding(cfg, batch, padding_side=padding_side)
+
+    # 17 tokens would round up to 24, but the batch is only padded to 20
+    assert torch.equal(batch["input_ids"], input_ids)
+
+
+@pytest.mark.parametrize("padding_side", ["left", "right"])
+@pytest.mark.parametrize(
+    "padding_quantile, training",
+    [(1.0, True), (1.0, False), (0.9, True), (0.5, True), (0.1, True)],
+)
+def test_batch_padding_without_rounding_matches_reference(
+    padding_side, padding_quantile, training
+):
+    generator = torch.Generator().manual_seed(42)
+    for _ in range(20):
+        max_length = int(torch.randint(1, 64, (1,), generator=generator))
+        token_lengths = torch.randint(
+            1, max_length + 1, (8,), generator=generator
+        ).tolist()
+        batch = get_batch(token_lengths, max_length, padding_side=padding_side)
+        input_ids = batch["input_ids"].clone()
+        idx = reference_cut(batch, padding_quantile, training, padding_side)
+
+        batch = batch_padding(
+            get_cfg(padding_quantile=padding_quantile, pad_to_multiple_of=1),
+            batch,
+            training=training,
+            padding_side=padding_side,
+        )
+
+        if padding_side == "left":
+            assert torch.equal(batch["input_ids"], input_ids[:, idx:])
+        else:
+            assert torch.equal(batch["input_ids"], input_ids[:, :idx])
+
+
+def test_batch_padding_quantile_zero_keeps_batch():
+    cfg = get_cfg(padding_quantile=0, pad_to_multiple_of=8)
+    batch = get_batch([5, 10, 12], max_length=32, padding_side="left")
+
+    batch = batch_padding(cfg, batch)
+
+    assert batch["input_ids"].shape == (3, 32)
@@ -548,13 +548,12 @@ def run_train_rlhf(
 
             # remove padding from query and response
             batch["input_ids"] = batch["input_ids"].detach().cpu()
+            # prompts are left padded, so the non-padded tokens are the
+            # trailing attention_mask.sum() tokens of each row
+            query_lengths = batch["attention_mask"].detach().sum(dim=1).int().tolist()
             query_tensor = [
-                input_ids[torch.where(att_mask == 1)[0].min() :]
-                if len(torch.where(att_mask == 1)[0]) > 0
-                else input_ids
-                for input_ids, att_mask in zip(
-                    batch["input_ids"].detach().cpu(), batch["attention_mask"]
-                )
+                input_ids[-query_length:] if query_length > 0 else input_ids
+                for input_ids, query_length in zip(batch["input_ids"], query_lengths)
             ]
             pad_tok_id = (
                 unwrap_model(model).backbone.config.pad_token_id
@@ -563,13 +562,16 @@ def run_train_rlhf(
             output_dict["predicted_answer_ids"] = (
                 output_dict["predicted_answer_ids"].detach().cpu()
             )
+            # responses end at their first pad token, if any
+            is_pad = (output_dict["predicted_answer_ids"] == pad_tok_id).int()
+            response_lengths = torch.where(
+                is_pad.any(dim=1), is_pad.argmax(dim=1), is_pad.size(1)
+            ).tolist()
             response_tensor = [
-                predicted_answer_ids[
-                    : torch.where(predicted_answer_ids == pad_tok_id)[0].min()
-                ]
-                if len(torch.where(predicted_answer_ids == pad_tok_id)[0]) > 0
-                else predicted_answer_ids
-                for predicted_answer_ids in output_dict["predicted_answer_ids"]
+                predicted_answer_ids[:response_length]
+                for predicted_answer_ids, response_length in zip(
+                    output_dict["predicted_answer_ids"], response_lengths
+                )
             ]
 
             del output_dict